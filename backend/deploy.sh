@@ -91,7 +91,8 @@ DYNAMODB_POLICY='{
       "Resource": [
         "arn:aws:dynamodb:'$REGION':*:table/adventure-game-state",
         "arn:aws:dynamodb:'$REGION':*:table/adventure-stats",
-        "arn:aws:dynamodb:'$REGION':*:table/adventure-story-scenes"
+        "arn:aws:dynamodb:'$REGION':*:table/adventure-story-scenes",
+        "arn:aws:dynamodb:'$REGION':*:table/adventure-rendered-images"
       ]
     }
   ]
@@ -163,6 +164,26 @@ aws dynamodb create-table \
   --billing-mode PAY_PER_REQUEST \
   --region $REGION 2>/dev/null || echo "Table adventure-story-scenes may already exist"
 
+# Rendered PNGs are only stored for the wkhtmltoimage renderer; Pillow (the
+# default) draws cards in-process and never touches this table
+if grep -qs "^IMAGE_RENDERER=[\"']\?html" .env; then
+  aws dynamodb create-table \
+    --table-name adventure-rendered-images \
+    --attribute-definitions AttributeName=render_id,AttributeType=S \
+    --key-schema AttributeName=render_id,KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --region $REGION 2>/dev/null || echo "Table adventure-rendered-images may already exist"
+fi
+
+# Seed an empty scene_counts map; 'ADD scene_counts.<scene>' fails without one
+aws dynamodb wait table-exists --table-name adventure-stats --region $REGION
+aws dynamodb update-item \
+  --table-name adventure-stats \
+  --key '{"stat_type": {"S": "scene_visits"}}' \
+  --update-expression 'SET scene_counts = if_not_exists(scene_counts, :empty)' \
+  --expression-attribute-values '{":empty": {"M": {}}}' \
+  --region $REGION || echo "Could not seed scene_counts in adventure-stats"
+
 # Create API Gateway
 echo "🌐 Setting up API Gateway..."
 
@@ -4,9 +4,12 @@ Generates meaningful AI prompts based on player state and choice consequences
 """
 
 import random
-from typing import Dict, List, Tuple, Optional
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, NamedTuple, Set, Tuple, Optional
 from enum import Enum
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, asdict, replace
 import json
 
 
@@ -29,125 +32,332 @@ class ReputationType(Enum):
     CORRUPTED = "corrupted"
 
 
-@dataclass
+# Player state summary at the top of the consequence context
+_CONTEXT_HEADER = """
+PLAYER STATE ANALYSIS:
+Crisis Level: {crisis}
+Health: {health}/{max_health} ({health_status})
+Food: {food} ({food_status})
+Gold: {gold} ({gold_status})
+Corruption: {corruption}/100 ({corruption_status})
+Reputation: {reputation}
+Level: {level} (XP: {experience})
+
+ACTIVE PROBLEMS:"""
+
+# Fixed problem lines for the context as (predicate, message); curses and injuries are listed separately
+_PROBLEM_CHECKS = (
+    (lambda state: state.food == 0, "- STARVING: Player will die soon without food"),
+    (lambda state: state.health <= 25, "- NEAR DEATH: Any combat could be fatal"),
+    (lambda state: state.gold <= 5, "- BROKE: Cannot afford basic necessities"),
+    (lambda state: state.corruption >= 50, "- CORRUPTED: Dark choices affecting all interactions"),
+)
+
+
+def classify_batch(states):
+    """Classify many states at once.
+
+    Takes an (N, 6) integer array-like of (health, max_health, food, gold,
+    corruption, n_curses) rows and returns N indices into tuple(CrisisLevel).
+    Requires NumPy; intended for balancing/playtesting simulations.
+    """
+    import numpy as np
+
+    health, max_health, food, gold, corruption, n_curses = np.asarray(states, dtype=np.int64).T
+    health_ratio = health / max_health
+    hungry = food <= 1
+
+    # Same tiers, in the same priority order, as get_crisis_level
+    levels = tuple(CrisisLevel)
+    return np.select(
+        [
+            (health_ratio <= 0.25) | (food == 0) | (n_curses >= 3),
+            ((health_ratio <= 0.4) & hungry) | (corruption >= 70),
+            (health_ratio <= 0.5) | hungry | (gold <= 5) | (corruption >= 50),
+            (health_ratio >= 0.7) & (food >= 2) & (gold >= 20),
+        ],
+        [
+            levels.index(CrisisLevel.CRITICAL),
+            levels.index(CrisisLevel.DESPERATE),
+            levels.index(CrisisLevel.STRUGGLING),
+            levels.index(CrisisLevel.STABLE),
+        ],
+        default=levels.index(CrisisLevel.THRIVING),
+    )
+
+
+# Prompt fragments for generate_scene_prompt, built once at import
+_PROMPT_HEADER = "You are creating an interactive adventure scene for a %s themed story.\n\n"
+
+_SCENE_REQUIREMENTS = """
+
+SCENE REQUIREMENTS:
+"""
+
+_CRISIS_BLOCKS = {
+    CrisisLevel.CRITICAL: """
+SURVIVAL MODE - Player is in immediate mortal danger:
+- Create life-or-death scenarios where wrong choice = death
+- Make resources extremely scarce and expensive
+- Show NPCs exploiting player's desperate state
+- Offer high-risk/high-reward options vs safe but costly alternatives
+- Emphasize time pressure and urgency
+""",
+    CrisisLevel.DESPERATE: """
+DESPERATION MODE - Player has serious problems:
+- Multiple threats affecting player simultaneously
+- Resources are scarce and overpriced
+- NPCs should notice player's weakness
+- Choices should involve difficult moral compromises
+- Show consequences of previous poor decisions
+""",
+    CrisisLevel.STRUGGLING: """
+CHALLENGE MODE - Player faces significant obstacles:
+- Present meaningful but manageable risks
+- Make resources available but at fair cost
+- NPCs react neutrally but opportunities exist
+- Balance risk vs reward carefully
+- Show paths to improvement requiring sacrifice
+""",
+    CrisisLevel.STABLE: """
+GROWTH MODE - Player is doing well:
+- Present opportunities for advancement
+- Allow player to help others or pursue goals
+- Resources available at normal prices
+- Focus on character development choices
+- Introduce new challenges appropriate to player's level
+""",
+    CrisisLevel.THRIVING: """
+POWER MODE - Player is thriving:
+- Present choices about using power responsibly
+- Allow player to affect larger events/NPCs
+- Introduce moral complexity and corruption temptations
+- Show how power can corrupt or inspire
+- Create scenarios where player's reputation matters
+""",
+}
+
+# Reputation-specific NPC behavior
+_REPUTATION_EFFECTS = {
+    ReputationType.HERO.value: "NPCs trust you, offer help, but expect heroic behavior",
+    ReputationType.MURDERER.value: "NPCs fear you, demand payment upfront, some flee",
+    ReputationType.THIEF.value: "NPCs guard possessions, watch you suspiciously",
+    ReputationType.DIPLOMAT.value: "NPCs respect you, offer information and fair deals",
+    ReputationType.CORRUPTED.value: "NPCs sense darkness, react with fear or disgust",
+    ReputationType.FEARED.value: "NPCs submit to intimidation but hate you"
+}
+_REPUTATION_LINES = {rep: f"\nNPC BEHAVIOR: {effect}\n" for rep, effect in _REPUTATION_EFFECTS.items()}
+
+# Resource economy guidance, formatted with the player's gold
+_ECONOMY_BLOCK = """
+RESOURCE ECONOMY:
+- Food costs 5-15 gold (player has %d)
+- Healing costs 20-50 gold
+- Magic services cost 30-100 gold
+- Make prices reflect player's desperate state if applicable
+
+CHOICE CONSEQUENCES:
+Generate exactly two choices where consequences match current state:
+"""
+
+# Choice consequence templates based on crisis level
+_HIGH_STAKES_CHOICES = """
+Choice A: HIGH RISK (20-40 health loss possible) / HIGH REWARD (significant gold/items)
+Choice B: SAFE OPTION (costs gold/food) / SURVIVAL FOCUSED (minimal gain but safer)
+"""
+_STANDARD_CHOICES = """
+Choice A: MODERATE RISK (10-20 health loss) / GOOD REWARD (fair gold/experience gain)
+Choice B: LOW RISK (minor costs) / MODEST REWARD (small but reliable gain)
+"""
+_CHOICE_TEMPLATES = {
+    CrisisLevel.CRITICAL: _HIGH_STAKES_CHOICES,
+    CrisisLevel.DESPERATE: _HIGH_STAKES_CHOICES,
+    CrisisLevel.STRUGGLING: _STANDARD_CHOICES,
+    CrisisLevel.STABLE: _STANDARD_CHOICES,
+    CrisisLevel.THRIVING: _STANDARD_CHOICES,
+}
+
+_SCENE_GENERATION_BLOCK = """
+SCENE GENERATION:
+1. Create engaging title reflecting current crisis level
+2. Write vivid description (2-3 sentences, use \\n for line breaks)
+3. Include summary of what happened since last scene
+4. Choose appropriate background color for mood
+5. Make choices feel meaningfully different
+6. Show how player's condition affects the situation
+7. Reflect reputation in NPC interactions
+8. Make resource scarcity feel real and impactful
+
+Remember: This player's choices have led to their current state. Show consequences!
+"""
+
+
+# Number of recent scene ids kept in PlayerState.scene_history
+SCENE_HISTORY_LENGTH = 10
+
+
+@dataclass(slots=True)
 class PlayerState:
     health: int = 100
     max_health: int = 100
     gold: int = 10
     food: int = 3
-    items: List[str] = None
+    items: List[str] = field(default_factory=lambda: ['rusty_dagger'])
     level: int = 1
     experience: int = 0
     corruption: int = 0
     reputation: str = ReputationType.UNKNOWN.value
     deaths: int = 0
-    scene_history: List[str] = None
-    curses: List[str] = None
-    permanent_injuries: List[str] = None
-    last_choice_consequences: Dict = None
-
-    def __post_init__(self):
-        if self.items is None:
-            self.items = ['rusty_dagger']
-        if self.scene_history is None:
-            self.scene_history = []
-        if self.curses is None:
-            self.curses = []
-        if self.permanent_injuries is None:
-            self.permanent_injuries = []
-        if self.last_choice_consequences is None:
-            self.last_choice_consequences = {}
-
+    scene_history: Deque[str] = field(default_factory=lambda: deque(maxlen=SCENE_HISTORY_LENGTH))
+    curses: Set[str] = field(default_factory=set)
+    permanent_injuries: Set[str] = field(default_factory=set)
+    last_choice_consequences: Dict = field(default_factory=dict)
+
+
+# Per-action effect tables, each mapping action keyword -> (low, high) roll range.
+# Constant effects use low == high.
+_ACTION_HEALTH = {
+    'fight': (-40, -20), 'attack': (-35, -15), 'kill': (-50, -25),
+    'speak': (5, 5), 'help': (-5, -5),
+    'rest': (25, 25), 'eat': (10, 10),
+    'search': (-15, 0),
+    'magic': (-15, 25),
+}
+_ACTION_GOLD = {
+    'fight': (15, 50), 'attack': (10, 40), 'kill': (20, 60),
+    'speak': (5, 15), 'negotiate': (10, 25),
+    'search': (0, 30),
+    'steal': (20, 60),
+}
+_ACTION_EXPERIENCE = {
+    'fight': (25, 25), 'attack': (20, 20),
+    'speak': (10, 10), 'negotiate': (20, 20), 'help': (15, 15),
+    'rest': (5, 5),
+    'search': (10, 10),
+    'magic': (35, 35),
+}
+_ACTION_FOOD = {
+    'fight': (-1, -1), 'rest': (-2, -2), 'eat': (-1, -1), 'search': (-1, -1),
+}
+_ACTION_CORRUPTION = {
+    'attack': (2, 2), 'kill': (5, 5), 'help': (-2, -2), 'steal': (5, 5), 'magic': (2, 8),
+}
+_ACTION_REPUTATION = {
+    'fight': ReputationType.FEARED.value,
+    'kill': ReputationType.MURDERER.value,
+    'speak': ReputationType.DIPLOMAT.value,
+    'negotiate': ReputationType.DIPLOMAT.value,
+    'help': ReputationType.HERO.value,
+    'steal': ReputationType.THIEF.value,
+}
+_ACTION_DESCRIPTIONS = {
+    # Combat actions - high risk/reward
+    'fight': 'violent confrontation',
+    'attack': 'aggressive action',
+    'kill': 'lethal violence',
+    # Peaceful actions - safer but lower rewards
+    'speak': 'diplomatic approach',
+    'negotiate': 'peaceful negotiation',
+    'help': 'selfless assistance',
+    # Survival actions
+    'rest': 'recuperation',
+    'eat': 'sustenance',
+    # Exploration actions
+    'search': 'risky exploration',
+    # Greed actions
+    'steal': 'criminal activity',
+    # Magic actions
+    'magic': 'arcane manipulation',
+}
+
+# State-dependent adjustments, keyed by (action, effect type)
+_STARVING_EFFECT_RANGES = {('eat', 'health'): (-15, -15)}  # range used instead when out of food
+_EFFECT_MIN_HEALTH = {('fight', 'gold'): 31}  # no loot unless still standing afterwards
+_EFFECT_CHANCES = {('search', 'food'): 0.3}  # probability the effect applies at all
+
+
+# Level-up (max health gain, heal amount) by corruption tier (<25, <50, 50+); None heals fully
+_LEVELUP_BENEFITS = ((25, None), (15, 20), (5, 10))
+
+def _roll(effect_range: Tuple[int, int], randint) -> int:
+    low, high = effect_range
+    return low if low == high else randint(low, high)
+
+
+def _apply_health(state: PlayerState, value: int, consequences: Dict) -> None:
+    old_health = state.health
+    state.health = max(0, min(state.max_health, state.health + value))
+    consequences['health'] = state.health - old_health
+
+
+def _apply_gold(state: PlayerState, value: int, consequences: Dict) -> None:
+    old_gold = state.gold
+    state.gold = max(0, state.gold + value)
+    consequences['gold'] = state.gold - old_gold
+
+
+def _apply_experience(state: PlayerState, value: int, consequences: Dict) -> None:
+    state.experience += value
+    consequences['experience'] = value
+
+
+def _apply_food(state: PlayerState, value: int, consequences: Dict) -> None:
+    old_food = state.food
+    state.food = max(0, state.food + value)
+    consequences['food'] = state.food - old_food
+
+
+def _apply_corruption(state: PlayerState, value: int, consequences: Dict) -> None:
+    old_corruption = state.corruption
+    state.corruption = max(0, min(100, state.corruption + value))
+    consequences['corruption'] = state.corruption - old_corruption
+
+
+_EFFECT_HANDLERS = {
+    'health': _apply_health,
+    'gold': _apply_gold,
+    'experience': _apply_experience,
+    'food': _apply_food,
+    'corruption': _apply_corruption,
+}
+
+# Rolled effects in application order (fight loot depends on health after the health roll)
+_EFFECT_TABLES = (
+    ('health', _ACTION_HEALTH),
+    ('gold', _ACTION_GOLD),
+    ('experience', _ACTION_EXPERIENCE),
+    ('food', _ACTION_FOOD),
+    ('corruption', _ACTION_CORRUPTION),
+)
+
+
+class _ContextKey(NamedTuple):
+    """Everything generate_consequence_context reads from a PlayerState"""
+    health: int
+    max_health: int
+    food: int
+    gold: int
+    corruption: int
+    reputation: str
+    level: int
+    experience: int
+    curses: Tuple[str, ...]
+    permanent_injuries: Tuple[str, ...]
+    previous_choice: Optional[str]
+    consequences: Tuple[Tuple[str, object], ...]
 
 class GameStateManager:
     """Manages player state and generates consequence-aware AI prompts"""
 
     def __init__(self):
-        self.action_consequences = {
-            # Combat actions - high risk/reward
-            'fight': {
-                'health': lambda s: -random.randint(20, 40),
-                'gold': lambda s: random.randint(15, 50) if s.health > 30 else 0,
-                'experience': 25,
-                'food': -1,
-                'reputation_change': ReputationType.FEARED.value,
-                'description': 'violent confrontation'
-            },
-            'attack': {
-                'health': lambda s: -random.randint(15, 35),
-                'gold': lambda s: random.randint(10, 40),
-                'experience': 20,
-                'corruption': 2,
-                'description': 'aggressive action'
-            },
-            'kill': {
-                'health': lambda s: -random.randint(25, 50),
-                'corruption': 5,
-                'gold': lambda s: random.randint(20, 60),
-                'reputation_change': ReputationType.MURDERER.value,
-                'description': 'lethal violence'
-            },
-
-            # Peaceful actions - safer but lower rewards
-            'speak': {
-                'health': 5,
-                'gold': lambda s: random.randint(5, 15),
-                'experience': 10,
-                'reputation_change': ReputationType.DIPLOMAT.value,
-                'description': 'diplomatic approach'
-            },
-            'negotiate': {
-                'gold': lambda s: random.randint(10, 25),
-                'experience': 20,
-                'reputation_change': ReputationType.DIPLOMAT.value,
-                'description': 'peaceful negotiation'
-            },
-            'help': {
-                'health': -5,
-                'experience': 15,
-                'corruption': -2,
-                'reputation_change': ReputationType.HERO.value,
-                'description': 'selfless assistance'
-            },
-
-            # Survival actions
-            'rest': {
-                'health': lambda s: min(25, s.max_health - s.health),
-                'food': -2,
-                'experience': 5,
-                'description': 'recuperation'
-            },
-            'eat': {
-                'health': lambda s: 10 if s.food > 0 else -15,
-                'food': lambda s: -1 if s.food > 0 else 0,
-                'description': 'sustenance'
-            },
-
-            # Exploration actions
-            'search': {
-                'health': lambda s: -random.randint(0, 15),
-                'gold': lambda s: random.randint(0, 30),
-                'experience': 10,
-                'food': lambda s: -1 if random.random() < 0.3 else 0,
-                'description': 'risky exploration'
-            },
-
-            # Greed actions
-            'steal': {
-                'gold': lambda s: random.randint(20, 60),
-                'corruption': 5,
-                'reputation_change': ReputationType.THIEF.value,
-                'description': 'criminal activity'
-            },
-
-            # Magic actions
-            'magic': {
-                'health': lambda s: random.randint(-15, 25),
-                'corruption': lambda s: random.randint(2, 8),
-                'experience': 35,
-                'description': 'arcane manipulation'
-            },
-        }
+        # Dedicated generator so runs can be reproduced with self._rand.seed(...)
+        self._rand = random.Random()
+
+        # Consequence contexts keyed by state fingerprint; rebuilt only when the state changes
+        self._cached_context = lru_cache(maxsize=256)(self._build_context)
+
+        # Keywords must start a word ('fighting' matches, 'skill' does not trigger 'kill')
+        self._action_re = re.compile(r'\b(' + '|'.join(map(re.escape, _ACTION_DESCRIPTIONS)) + r')')
 
     def get_crisis_level(self, state: PlayerState) -> CrisisLevel:
         """Determine the player's current crisis level"""
@@ -210,47 +420,56 @@ class GameStateManager:
 
     def generate_consequence_context(self, state: PlayerState, previous_choice: str = None) -> str:
         """Generate detailed context about current player state for AI"""
+        key = _ContextKey(
+            state.health, state.max_health, state.food, state.gold, state.corruption,
+            state.reputation, state.level, state.experience,
+            tuple(sorted(state.curses)), tuple(sorted(state.permanent_injuries)),
+            previous_choice,
+            tuple(sorted(state.last_choice_consequences.items()))
+            if previous_choice and state.last_choice_consequences else (),
+        )
+        try:
+            return self._cached_context(key)
+        except TypeError:  # unhashable consequence value (e.g. a nested dict); build uncached
+            return self._build_context(key)
+
+    def _build_context(self, key: _ContextKey) -> str:
+        """Build the consequence context for a state fingerprint (cached per manager)"""
+        # The classifiers and problem checks take a PlayerState; rebuild one from
+        # the fingerprint (only on a cache miss)
+        state = PlayerState(
+            health=key.health, max_health=key.max_health, gold=key.gold, food=key.food,
+            level=key.level, experience=key.experience, corruption=key.corruption,
+            reputation=key.reputation, curses=set(key.curses), permanent_injuries=set(key.permanent_injuries),
+        )
         crisis = self.get_crisis_level(state)
         resources = self.get_resource_status(state)
 
-        context = f"""
-PLAYER STATE ANALYSIS:
-Crisis Level: {crisis.value.upper()}
-Health: {state.health}/{state.max_health} ({resources['health']})
-Food: {state.food} ({resources['food']})
-Gold: {state.gold} ({resources['gold']})
-Corruption: {state.corruption}/100 ({resources['corruption']})
-Reputation: {state.reputation.upper()}
-Level: {state.level} (XP: {state.experience})
-
-ACTIVE PROBLEMS:
-"""
-
-        problems = []
-        if state.food == 0:
-            problems.append("- STARVING: Player will die soon without food")
-        if state.health <= 25:
-            problems.append("- NEAR DEATH: Any combat could be fatal")
-        if state.gold <= 5:
-            problems.append("- BROKE: Cannot afford basic necessities")
-        if state.corruption >= 50:
-            problems.append("- CORRUPTED: Dark choices affecting all interactions")
-        if state.curses:
-            problems.append(f"- CURSED: {', '.join(state.curses)}")
-        if state.permanent_injuries:
-            problems.append(f"- INJURED: {', '.join(state.permanent_injuries)}")
-
-        if problems:
-            context += '\n'.join(problems)
-        else:
-            context += "- No immediate threats"
-
-        if previous_choice:
-            context += f"\n\nPREVIOUS ACTION: {previous_choice}"
-            if state.last_choice_consequences:
-                context += f"\nCONSEQUENCES: {state.last_choice_consequences}"
-
-        return context
+        parts = [_CONTEXT_HEADER.format(
+            crisis=crisis.value.upper(),
+            health=key.health, max_health=key.max_health, health_status=resources['health'],
+            food=key.food, food_status=resources['food'],
+            gold=key.gold, gold_status=resources['gold'],
+            corruption=key.corruption, corruption_status=resources['corruption'],
+            reputation=key.reputation.upper(),
+            level=key.level, experience=key.experience,
+        )]
+
+        problems_start = len(parts)
+        parts.extend(message for check, message in _PROBLEM_CHECKS if check(state))
+        if key.curses:
+            parts.append(f"- CURSED: {', '.join(key.curses)}")
+        if key.permanent_injuries:
+            parts.append(f"- INJURED: {', '.join(key.permanent_injuries)}")
+        if len(parts) == problems_start:
+            parts.append("- No immediate threats")
+
+        if key.previous_choice:
+            parts.append(f"\nPREVIOUS ACTION: {key.previous_choice}")
+            if key.consequences:
+                parts.append(f"CONSEQUENCES: {dict(key.consequences)}")
+
+        return "\n".join(parts)
 
     def generate_scene_prompt(self, state: PlayerState, theme: str, previous_scene: Dict = None, choice_made: str = None) -> str:
         """Generate a consequence-aware prompt for AI scene generation"""
@@ -258,186 +477,86 @@ ACTIVE PROBLEMS:
         crisis = self.get_crisis_level(state)
         context = self.generate_consequence_context(state, choice_made)
 
-        # Base prompt structure
-        prompt = f"""You are creating an interactive adventure scene for a {theme} themed story.
-
-{context}
-
-SCENE REQUIREMENTS:
-"""
-
-        # Crisis-specific scene requirements
-        if crisis == CrisisLevel.CRITICAL:
-            prompt += """
-SURVIVAL MODE - Player is in immediate mortal danger:
-- Create life-or-death scenarios where wrong choice = death
-- Make resources extremely scarce and expensive
-- Show NPCs exploiting player's desperate state
-- Offer high-risk/high-reward options vs safe but costly alternatives
-- Emphasize time pressure and urgency
-"""
-        elif crisis == CrisisLevel.DESPERATE:
-            prompt += """
-DESPERATION MODE - Player has serious problems:
-- Multiple threats affecting player simultaneously
-- Resources are scarce and overpriced
-- NPCs should notice player's weakness
-- Choices should involve difficult moral compromises
-- Show consequences of previous poor decisions
-"""
-        elif crisis == CrisisLevel.STRUGGLING:
-            prompt += """
-CHALLENGE MODE - Player faces significant obstacles:
-- Present meaningful but manageable risks
-- Make resources available but at fair cost
-- NPCs react neutrally but opportunities exist
-- Balance risk vs reward carefully
-- Show paths to improvement requiring sacrifice
-"""
-        elif crisis == CrisisLevel.STABLE:
-            prompt += """
-GROWTH MODE - Player is doing well:
-- Present opportunities for advancement
-- Allow player to help others or pursue goals
-- Resources available at normal prices
-- Focus on character development choices
-- Introduce new challenges appropriate to player's level
-"""
-        else:  # THRIVING
-            prompt += """
-POWER MODE - Player is thriving:
-- Present choices about using power responsibly
-- Allow player to affect larger events/NPCs
-- Introduce moral complexity and corruption temptations
-- Show how power can corrupt or inspire
-- Create scenarios where player's reputation matters
-"""
-
-        # Reputation-specific NPC behavior
-        reputation_effects = {
-            ReputationType.HERO.value: "NPCs trust you, offer help, but expect heroic behavior",
-            ReputationType.MURDERER.value: "NPCs fear you, demand payment upfront, some flee",
-            ReputationType.THIEF.value: "NPCs guard possessions, watch you suspiciously",
-            ReputationType.DIPLOMAT.value: "NPCs respect you, offer information and fair deals",
-            ReputationType.CORRUPTED.value: "NPCs sense darkness, react with fear or disgust",
-            ReputationType.FEARED.value: "NPCs submit to intimidation but hate you"
-        }
-
-        if state.reputation in reputation_effects:
-            prompt += f"\nNPC BEHAVIOR: {reputation_effects[state.reputation]}\n"
-
-        # Resource economy guidance
-        prompt += f"""
-RESOURCE ECONOMY:
-- Food costs 5-15 gold (player has {state.gold})
-- Healing costs 20-50 gold
-- Magic services cost 30-100 gold
-- Make prices reflect player's desperate state if applicable
-
-CHOICE CONSEQUENCES:
-Generate exactly two choices where consequences match current state:
-"""
-
-        # Choice consequence templates based on crisis level
-        if crisis in [CrisisLevel.CRITICAL, CrisisLevel.DESPERATE]:
-            prompt += """
-Choice A: HIGH RISK (20-40 health loss possible) / HIGH REWARD (significant gold/items)
-Choice B: SAFE OPTION (costs gold/food) / SURVIVAL FOCUSED (minimal gain but safer)
-"""
-        else:
-            prompt += """
-Choice A: MODERATE RISK (10-20 health loss) / GOOD REWARD (fair gold/experience gain)
-Choice B: LOW RISK (minor costs) / MODEST REWARD (small but reliable gain)
-"""
-
-        prompt += """
-SCENE GENERATION:
-1. Create engaging title reflecting current crisis level
-2. Write vivid description (2-3 sentences, use \\n for line breaks)
-3. Include summary of what happened since last scene
-4. Choose appropriate background color for mood
-5. Make choices feel meaningfully different
-6. Show how player's condition affects the situation
-7. Reflect reputation in NPC interactions
-8. Make resource scarcity feel real and impactful
-
-Remember: This player's choices have led to their current state. Show consequences!
-"""
-
-        return prompt
+        return "".join((
+            _PROMPT_HEADER % theme,
+            context,
+            _SCENE_REQUIREMENTS,
+            _CRISIS_BLOCKS[crisis],
+            _REPUTATION_LINES.get(state.reputation, ""),
+            _ECONOMY_BLOCK % state.gold,
+            _CHOICE_TEMPLATES[crisis],
+            _SCENE_GENERATION_BLOCK,
+        ))
+
+    def _roll_effect(self, action: str, effect_type: str, effect_range: Tuple[int, int], state: PlayerState) -> int:
+        """Roll a single effect value, applying any state-dependent adjustment"""
+        key = (action, effect_type)
+        if state.food <= 0:
+            effect_range = _STARVING_EFFECT_RANGES.get(key, effect_range)
+        if state.health < _EFFECT_MIN_HEALTH.get(key, 0):
+            return 0
+        chance = _EFFECT_CHANCES.get(key)
+        if chance is not None and self._rand.random() >= chance:
+            return 0
+        return _roll(effect_range, self._rand.randint)
 
     #TODO fix the choice system + consequences system to be consistent and make sense
+    # (until then consequences are disabled and the code after the return never runs)
     def apply_choice_consequences(self, state: PlayerState, choice_text: str, scene_id: str) -> PlayerState:
-        return state
         """Apply consequences of a choice to player state"""
-        new_state = PlayerState(**asdict(state))
+        return state
+        # Only the containers are copied; their elements are immutable strings
+        new_state = replace(
+            state,
+            items=list(state.items),
+            scene_history=deque(state.scene_history, maxlen=SCENE_HISTORY_LENGTH),
+            curses=set(state.curses),
+            permanent_injuries=set(state.permanent_injuries),
+            last_choice_consequences=dict(state.last_choice_consequences),
+        )
 
         # Automatic survival costs
         new_state.food = max(0, new_state.food - 1)
 
         # Starvation damage
         if new_state.food <= 0:
-            starvation_damage = random.randint(15, 25)
+            starvation_damage = self._rand.randint(15, 25)
             new_state.health = max(0, new_state.health - starvation_damage)
             new_state.last_choice_consequences = {
                 'starvation_damage': starvation_damage,
                 'message': 'Starvation weakens you severely'
             }
-            if 'starving' not in new_state.curses:
-                new_state.curses.append('starving')
+            new_state.curses.add('starving')
 
         # Apply choice-specific consequences
         choice_lower = choice_text.lower()
         consequences = {}
 
-        for keyword, effects in self.action_consequences.items():
-            if keyword in choice_lower:
-                for effect_type, effect_value in effects.items():
-                    if effect_type == 'description':
-                        continue
-
-                    if callable(effect_value):
-                        value = effect_value(new_state)
-                    else:
-                        value = effect_value
-
-                    if effect_type == 'health':
-                        old_health = new_state.health
-                        new_state.health = max(0, min(new_state.max_health, new_state.health + value))
-                        consequences['health'] = new_state.health - old_health
-                    elif effect_type == 'gold':
-                        old_gold = new_state.gold
-                        new_state.gold = max(0, new_state.gold + value)
-                        consequences['gold'] = new_state.gold - old_gold
-                    elif effect_type == 'food':
-                        old_food = new_state.food
-                        new_state.food = max(0, new_state.food + value)
-                        consequences['food'] = new_state.food - old_food
-                    elif effect_type == 'experience':
-                        new_state.experience += value
-                        consequences['experience'] = value
-                    elif effect_type == 'corruption':
-                        old_corruption = new_state.corruption
-                        new_state.corruption = max(0, min(100, new_state.corruption + value))
-                        consequences['corruption'] = new_state.corruption - old_corruption
-                    elif effect_type == 'reputation_change':
-                        old_rep = new_state.reputation
-                        new_state.reputation = value
-                        consequences['reputation'] = f'{old_rep} -> {value}'
-
-                new_state.last_choice_consequences = consequences
-                break
+        match = self._action_re.search(choice_lower)
+        if match:
+            action = match.group(1)
+            for effect_type, table in _EFFECT_TABLES:
+                effect_range = table.get(action)
+                if effect_range is not None:
+                    value = self._roll_effect(action, effect_type, effect_range, new_state)
+                    _EFFECT_HANDLERS[effect_type](new_state, value, consequences)
+
+            reputation = _ACTION_REPUTATION.get(action)
+            if reputation is not None:
+                old_rep = new_state.reputation
+                new_state.reputation = reputation
+                consequences['reputation'] = f'{old_rep} -> {reputation}'
+
+            new_state.last_choice_consequences = consequences
 
         # Critical failure from high corruption
-        if new_state.corruption > 60 and random.random() < 0.15:
+        if new_state.corruption > 60 and self._rand.random() < 0.15:
             corruption_damage = new_state.health // 3
             new_state.health = max(1, new_state.health - corruption_damage)
             consequences['corruption_damage'] = corruption_damage
 
-        # Add to scene history
+        # Add to scene history (the deque drops the oldest entry itself)
         new_state.scene_history.append(scene_id)
-        if len(new_state.scene_history) > 10:
-            new_state.scene_history = new_state.scene_history[-10:]
 
         # Level up logic
         exp_needed = new_state.level * 150
@@ -445,24 +564,19 @@ Remember: This player's choices have led to their current state. Show consequenc
             new_state.level += 1
 
             # Corruption affects level benefits
-            if new_state.corruption < 25:
-                health_gain = 25
-                new_state.max_health += health_gain
+            tier = (new_state.corruption >= 25) + (new_state.corruption >= 50)
+            health_gain, heal = _LEVELUP_BENEFITS[tier]
+            new_state.max_health += health_gain
+            if heal is None:
                 new_state.health = new_state.max_health
-            elif new_state.corruption < 50:
-                health_gain = 15
-                new_state.max_health += health_gain
-                new_state.health = min(new_state.max_health, new_state.health + 20)
             else:
-                health_gain = 5
-                new_state.max_health += health_gain
-                new_state.health = min(new_state.max_health, new_state.health + 10)
+                new_state.health = min(new_state.max_health, new_state.health + heal)
 
             consequences['level_up'] = {'new_level': new_state.level, 'health_gain': health_gain}
-
         return new_state
 
-    def is_dead(self, state: PlayerState) -> bool:
+    @staticmethod
+    def is_dead(state: PlayerState) -> bool:
         """Check if player has died"""
         return state.health <= 0
 
@@ -479,10 +593,25 @@ Remember: This player's choices have led to their current state. Show consequenc
 
     def export_state(self, state: PlayerState) -> Dict:
         """Export state to dictionary for storage"""
-        return asdict(state)
+        state_dict = asdict(state)
+        state_dict['scene_history'] = list(state.scene_history)
+        # Sorted lists keep the stored form deterministic (and DynamoDB rejects empty sets)
+        state_dict['curses'] = sorted(state.curses)
+        state_dict['permanent_injuries'] = sorted(state.permanent_injuries)
+        return state_dict
 
     def import_state(self, state_dict: Dict) -> PlayerState:
         """Import state from dictionary"""
+        state_dict = {
+            **state_dict,
+            'scene_history': deque(state_dict.get('scene_history', ()), maxlen=SCENE_HISTORY_LENGTH),
+        }
+        # Stored as sorted lists (see export_state)
+        for key in ('curses', 'permanent_injuries'):
+            if key in state_dict:
+                state_dict[key] = set(state_dict[key])
+        # Scenes stored while PlayerState still carried this field
+        state_dict.pop('last_choice_consequences_str', None)
         return PlayerState(**state_dict)
 
 
@@ -506,10 +635,19 @@ if __name__ == "__main__":
         PlayerState(health=150, max_health=150, gold=200, food=10, level=5)
     ]
 
+    # Classify all scenarios in one vectorized pass
+    try:
+        crisis_levels = tuple(CrisisLevel)
+        scenario_levels = [crisis_levels[index] for index in classify_batch([
+            (s.health, s.max_health, s.food, s.gold, s.corruption, len(s.curses)) for s in scenarios
+        ])]
+    except ImportError:  # NumPy is optional; classify one state at a time instead
+        scenario_levels = [gsm.get_crisis_level(s) for s in scenarios]
+
     for i, state in enumerate(scenarios):
         print(f"\n{'='*50}")
         print(f"SCENARIO {i+1}:")
-        print(f"Crisis Level: {gsm.get_crisis_level(state).value}")
+        print(f"Crisis Level: {scenario_levels[i].value}")
         print(f"Resources: {gsm.get_resource_status(state)}")
         print(f"\nAI PROMPT:")
         print(gsm.generate_scene_prompt(state, "fantasy"))
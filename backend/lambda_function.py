@@ -1,30 +1,48 @@
 import json
 import boto3
-import base64
-from PIL import Image, ImageDraw, ImageFont
+from botocore.config import Config
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+import binascii
+import hashlib
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
 import uuid
 import time
 from datetime import datetime
 import random
 import os
+from types import MappingProxyType
 import subprocess
-import tempfile
 from google import genai
 from pydantic import BaseModel
 from typing import List, Optional
 from dotenv import load_dotenv
-from jinja2 import Template
 import game_state_manager
 import traceback
 
 load_dotenv()
 
-# DynamoDB setup
-dynamodb = boto3.resource('dynamodb')
+# DynamoDB setup; created once per container so warm invocations reuse the
+# pooled HTTPS connections, kept alive between requests. Calls touch one or two
+# items and normally take milliseconds, so a stalled connection is retried quickly
+# rather than eating into the 30s function timeout.
+dynamodb = boto3.resource('dynamodb', config=Config(
+    tcp_keepalive=True,
+    connect_timeout=1,
+    read_timeout=2,
+    retries={'mode': 'standard', 'max_attempts': 3}
+))
 game_state_table = dynamodb.Table('adventure-game-state')
 stats_table = dynamodb.Table('adventure-stats')
 story_scenes_table = dynamodb.Table('adventure-story-scenes')
+rendered_images_table = dynamodb.Table('adventure-rendered-images')
+# Low-level client for the per-request calls and multi-item transactions; it
+# skips the resource layer's request/response marshalling (typed attribute values)
+dynamodb_client = dynamodb.meta.client
+_deserialize = TypeDeserializer().deserialize
+_serialize = TypeSerializer().serialize
+GAME_STATE_KEY = {'game_id': {'S': 'global'}}
 
 # Google Gemini setup
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
@@ -82,21 +100,27 @@ ITEMS = {
     'detective_badge': {'name': 'Detective Badge', 'type': 'special', 'power': 10}
 }
 
-# Initial scene for new games
-INITIAL_SCENE = {
+# Initial scene for new games (read-only; initial_scene() hands out copies)
+INITIAL_SCENE = MappingProxyType({
     'scene_id': 'start',
     'title': 'The Adventure Begins',
     'description': 'Welcome, brave adventurer! Your journey starts here.\nEvery choice shapes a unique story just for you.',
     'background_color': '#2d5016',
-    'choices': {
-        'a': {'text': 'Begin a Fantasy Quest', 'leads_to': 'fantasy_start'},
-        'b': {'text': 'Start Sci-Fi Adventure', 'leads_to': 'scifi_start'}
-    },
+    'choices': MappingProxyType({
+        'a': MappingProxyType({'text': 'Begin a Fantasy Quest', 'leads_to': 'fantasy_start'}),
+        'b': MappingProxyType({'text': 'Start Sci-Fi Adventure', 'leads_to': 'scifi_start'})
+    }),
     'theme': 'fantasy',
     'created_at': datetime.now().isoformat(),
-    'player_state': game_state_manager.PlayerState(),
     'summary': 'Your adventure begins in this mysterious realm.'
-}
+})
+
+def initial_scene():
+    """A fresh copy of INITIAL_SCENE with its own PlayerState"""
+    return {**INITIAL_SCENE, 'player_state': game_state_manager.PlayerState()}
+
+# Shown for a scene without the requested choice (read-only, shared)
+DEFAULT_CHOICE = {'text': 'Continue Adventure', 'leads_to': 'start'}
 
 # HTML Template for scene rendering
 SCENE_TEMPLATE = """
@@ -391,41 +415,9 @@ CHOICE_TEMPLATE = """
 <body>
     <div class="button-content">
         <div class="choice-label">Choice {{ choice_type.upper() }}</div>
-        <div class="choice-text" id="choiceText">{{ text }}</div>
+        <div class="choice-text {{ size_class }}">{{ text }}</div>
     </div>
     <div class="shine"></div>
-
-    <script>
-        // Auto-scale text to fit within button
-        function scaleTextToFit() {
-            const textElement = document.getElementById('choiceText');
-            const text = textElement.textContent;
-
-            // Add classes based on text length
-            if (text.length > 40) {
-                textElement.classList.add('very-long-text');
-            } else if (text.length > 25) {
-                textElement.classList.add('long-text');
-            }
-
-            // Additional dynamic scaling if needed
-            const container = textElement.parentElement;
-            const containerWidth = container.offsetWidth - 30; // Account for padding
-
-            let fontSize = window.getComputedStyle(textElement).fontSize;
-            fontSize = parseInt(fontSize);
-
-            // Reduce font size until text fits
-            while (textElement.scrollWidth > containerWidth && fontSize > 10) {
-                fontSize -= 1;
-                textElement.style.fontSize = fontSize + 'px';
-            }
-        }
-
-        // Run after fonts load
-        window.addEventListener('load', scaleTextToFit);
-        document.fonts.ready.then(scaleTextToFit);
-    </script>
 </body>
 </html>
 """
@@ -486,7 +478,7 @@ def lambda_handler(event, context):
         return {
             'statusCode': 200,
             'headers': headers,
-            'body': base64.b64encode(image_data).decode('utf-8'),
+            'body': binascii.b2a_base64(image_data, newline=False).decode('ascii'),
             'isBase64Encoded': True
         }
         
@@ -497,73 +489,175 @@ def lambda_handler(event, context):
         return {
             'statusCode': 200,
             'headers': headers,
-            'body': base64.b64encode(error_image).decode('utf-8'),
+            'body': binascii.b2a_base64(error_image, newline=False).decode('ascii'),
             'isBase64Encoded': True
         }
 
-def get_current_game_state():
-    """Retrieve current game state from DynamoDB"""
+def new_game_state():
+    """Game state for a story that hasn't started yet"""
+    return {
+        'game_id': 'global',
+        'current_scene': 'start',
+        'total_players': 0,
+        'choices_made': 0,
+        'last_updated': datetime.now().isoformat()
+    }
+
+# One README view requests scene.png, both option images and stats.png back to
+# back, so a warm container reuses the last read for a moment instead of
+# repeating the same get_item
+GAME_STATE_TTL = 1.0
+_state_cache = {'value': None, 'expires': 0.0}
+
+def get_current_game_state(fresh=False):
+    """Retrieve current game state from DynamoDB (briefly cached unless fresh)"""
+    now = time.monotonic()
+    if not fresh and _state_cache['value'] is not None and now < _state_cache['expires']:
+        return _state_cache['value']
+
     print("DEBUG: Getting current game state from DynamoDB")
     try:
-        response = game_state_table.get_item(Key={'game_id': 'global'})
+        response = dynamodb_client.get_item(TableName=game_state_table.name, Key=GAME_STATE_KEY)
         print(f"DEBUG: DynamoDB response: {response}")
         if 'Item' in response:
-            return response['Item']
+            item = {name: _deserialize(value) for name, value in response['Item'].items()}
+            _state_cache['value'] = item
+            _state_cache['expires'] = now + GAME_STATE_TTL
+            return item
         else:
             # Initialize new game state
-            initial_state = {
-                'game_id': 'global',
-                'current_scene': 'start',
-                'total_players': 0,
-                'choices_made': 0,
-                'last_updated': datetime.now().isoformat()
-            }
-            game_state_table.put_item(Item=initial_state)
+            initial_state = new_game_state()
+            try:
+                # Don't clobber a state another invocation created or updated meanwhile
+                game_state_table.put_item(
+                    Item=initial_state,
+                    ConditionExpression='attribute_not_exists(game_id)'
+                )
+            except dynamodb_client.exceptions.ConditionalCheckFailedException:
+                print("DEBUG: Game state was initialized concurrently")
             return initial_state
     except Exception as e:
         print(f"Error getting game state: {e}")
-        return {
-            'game_id': 'global',
-            'current_scene': 'start',
-            'total_players': 0,
-            'choices_made': 0,
-            'last_updated': datetime.now().isoformat()
-        }
+        return new_game_state()
+
+def update_game_state(new_scene, expected_scene=None):
+    """Update game state in DynamoDB, optionally only if still on expected_scene"""
+    values = {
+        ':scene': {'S': new_scene},
+        ':now': {'S': datetime.now().isoformat()},
+        ':inc': {'N': '1'}
+    }
+    condition = {}
+    if expected_scene is not None:
+        condition['ConditionExpression'] = 'current_scene = :expected'
+        values[':expected'] = {'S': expected_scene}
 
-def update_game_state(new_scene):
-    """Update game state in DynamoDB"""
     try:
-        current_state = get_current_game_state()
-        current_state['current_scene'] = new_scene
-        current_state['choices_made'] = current_state.get('choices_made', 0) + 1
-        current_state['last_updated'] = datetime.now().isoformat()
-        
-        game_state_table.put_item(Item=current_state)
+        # Single write; ADD creates choices_made if the item doesn't exist yet
+        dynamodb_client.update_item(
+            TableName=game_state_table.name,
+            Key=GAME_STATE_KEY,
+            UpdateExpression='SET current_scene = :scene, last_updated = :now ADD choices_made :inc',
+            ExpressionAttributeValues=values,
+            **condition
+        )
+        _state_cache['value'] = None
         
         # Update statistics
         update_stats(new_scene)
+        return True
         
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        print(f"DEBUG: Story already moved past {expected_scene}, ignoring stale choice")
     except Exception as e:
         print(f"Error updating game state: {e}")
+    return False
 
 def update_stats(scene_id):
     """Update statistics in DynamoDB"""
+    updates = [
+        {
+            'TableName': stats_table.name,
+            'Key': {'stat_type': {'S': 'scene_visits'}},
+            'UpdateExpression': 'ADD scene_counts.#scene :inc',
+            'ExpressionAttributeNames': {'#scene': scene_id},
+            'ExpressionAttributeValues': {':inc': {'N': '1'}}
+        },
+        {
+            'TableName': stats_table.name,
+            'Key': {'stat_type': {'S': 'total_choices'}},
+            'UpdateExpression': 'ADD choice_count :inc',
+            'ExpressionAttributeValues': {':inc': {'N': '1'}}
+        }
+    ]
     try:
-        stats_table.update_item(
-            Key={'stat_type': 'scene_visits'},
-            UpdateExpression='ADD scene_counts.#scene :inc',
-            ExpressionAttributeNames={'#scene': scene_id},
-            ExpressionAttributeValues={':inc': 1}
+        # Both counters in one round trip
+        dynamodb_client.transact_write_items(
+            TransactItems=[{'Update': update} for update in updates]
         )
+        return
+    except dynamodb_client.exceptions.TransactionCanceledException as e:
+        # Nothing was written. The usual cause is a missing scene_counts map
+        # (deploy.sh seeds it), so create the map and retry once
+        print(f"Stats transaction cancelled for scene {scene_id}: {e}")
+    except Exception as e:
+        print(f"Error updating stats: {e}")
+        return
 
-        stats_table.update_item(
-            Key={'stat_type': 'total_choices'},
-            UpdateExpression='ADD choice_count :inc',
-            ExpressionAttributeValues={':inc': 1}
+    try:
+        dynamodb_client.update_item(
+            TableName=stats_table.name,
+            Key={'stat_type': {'S': 'scene_visits'}},
+            UpdateExpression='SET scene_counts = if_not_exists(scene_counts, :empty)',
+            ExpressionAttributeValues={':empty': {'M': {}}}
+        )
+        dynamodb_client.transact_write_items(
+            TransactItems=[{'Update': update} for update in updates]
         )
-
     except Exception as e:
-        print(f"Error updating stats: {e}")
+        print(f"Error updating stats, visit to {scene_id} not counted: {e}")
+
+# Scenes are never rewritten once stored, so a warm container keeps recently
+# used ones (with player_state already imported) instead of re-reading them
+_SCENE_CACHE = {}
+_SCENE_CACHE_SIZE = 256
+# Prefetch threads store scenes too; serialize the evict-then-insert
+_SCENE_CACHE_LOCK = threading.Lock()
+
+def _remember_scene(scene):
+    """Keep a loaded or freshly generated scene for later invocations"""
+    with _SCENE_CACHE_LOCK:
+        if len(_SCENE_CACHE) >= _SCENE_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            del _SCENE_CACHE[next(iter(_SCENE_CACHE))]
+        _SCENE_CACHE[scene['scene_id']] = scene
+    return scene
+
+# Successor scenes being generated ahead of the player, keyed by scene_id.
+# Off by default since it also generates the branch not taken; set
+# PREFETCH_SCENES=1 to trade Gemini calls for a faster next choice.
+PREFETCH_SCENES = os.getenv('PREFETCH_SCENES', '0') == '1'
+# A prefetch can be left hanging in a Gemini call by a frozen container, so
+# don't wait on one longer than this before generating in the foreground
+PREFETCH_WAIT_SECONDS = 10
+_PREFETCHING = {}
+_scene_pool = None
+
+def prefetch_next_scenes(scene):
+    """Start loading/generating both successors of scene in the background"""
+    global _scene_pool
+    if not PREFETCH_SCENES:
+        return
+    if _scene_pool is None:
+        _scene_pool = ThreadPoolExecutor(max_workers=2)
+    for choice, option in scene.get('choices', {}).items():
+        scene_id = option['leads_to']
+        if scene_id == 'start' or scene_id in _SCENE_CACHE or scene_id in _PREFETCHING:
+            continue
+        print(f"DEBUG: Prefetching scene: {scene_id}")
+        future = _scene_pool.submit(load_or_generate_scene, scene_id, scene.get('theme', 'fantasy'), scene, choice)
+        _PREFETCHING[scene_id] = future
+        future.add_done_callback(lambda _, scene_id=scene_id: _PREFETCHING.pop(scene_id, None))
 
 def get_or_generate_scene(scene_id, theme='fantasy', previous_scene=None, choice_made=None):
     """Get scene from DynamoDB or generate new one if it doesn't exist"""
@@ -572,19 +666,49 @@ def get_or_generate_scene(scene_id, theme='fantasy', previous_scene=None, choice
     # Handle initial scene specially
     if scene_id == 'start':
         print("DEBUG: Returning initial scene")
-        return INITIAL_SCENE
+        return initial_scene()
+
+    scene = _SCENE_CACHE.get(scene_id)
+    if scene is not None:
+        print("DEBUG: Found scene in memory")
+        return scene
+
+    pending = _PREFETCHING.get(scene_id)
+    if pending is not None:
+        # Already on its way; wait rather than asking Gemini a second time
+        print("DEBUG: Waiting for prefetched scene")
+        try:
+            scene = pending.result(timeout=PREFETCH_WAIT_SECONDS)
+        except FutureTimeoutError:
+            print(f"DEBUG: Prefetch of {scene_id} still running, generating in the foreground")
+        except Exception as e:
+            print(f"Error prefetching scene {scene_id}: {e}")
+        if scene is not None:
+            return scene
+
+    return load_or_generate_scene(scene_id, theme, previous_scene, choice_made)
+
+def load_stored_scene(scene_id):
+    """Read scene_id from DynamoDB, or None if it hasn't been stored"""
+    # The low-level client, unlike the table resource, is safe to share
+    # with the prefetch threads
+    response = dynamodb_client.get_item(TableName=story_scenes_table.name, Key={'scene_id': {'S': scene_id}})
+    if 'Item' not in response:
+        return None
+    processed_scene = {name: _deserialize(value) for name, value in response['Item'].items()}
+    processed_scene['player_state'] = game_state.import_state(processed_scene['player_state'])
+    return _remember_scene(processed_scene)
 
+def load_or_generate_scene(scene_id, theme='fantasy', previous_scene=None, choice_made=None):
+    """Read scene_id from DynamoDB, generating and storing it if missing"""
     try:
         # Try to get existing scene from DynamoDB
         print(f"DEBUG: Checking DynamoDB for existing scene: {scene_id}")
-        response = story_scenes_table.get_item(Key={'scene_id': scene_id})
-        if 'Item' in response:
+        scene = load_stored_scene(scene_id)
+        if scene is not None:
             print(f"DEBUG: Found existing scene in DynamoDB")
-            processed_scene = {**response['Item']}
-            processed_scene['player_state'] = game_state.import_state(processed_scene['player_state'])
-            return processed_scene
-        else:
-            print(f"DEBUG: Scene not found in DynamoDB, will generate new one")
+            return scene
+        print(f"DEBUG: Scene not found in DynamoDB, will generate new one")
     except Exception as e:
         print(f"Error fetching scene {scene_id}: {e}")
 
@@ -615,8 +739,21 @@ def generate_new_scene(scene_id, theme='fantasy', previous_scene=None, choice_ma
     try:
         saveable_scene = {**gemini_scene}
         saveable_scene['player_state'] = game_state.export_state(gemini_scene['player_state'])
-        story_scenes_table.put_item(Item=saveable_scene)
+        # Scene ids are deterministic, so a prefetch or another container may
+        # have stored this scene meanwhile; keep whichever copy landed first
+        dynamodb_client.put_item(
+            TableName=story_scenes_table.name,
+            Item={name: _serialize(value) for name, value in saveable_scene.items()},
+            ConditionExpression='attribute_not_exists(scene_id)'
+        )
         print(f"Saved Gemini-generated scene: {scene_id}")
+        _remember_scene(gemini_scene)
+    except dynamodb_client.exceptions.ConditionalCheckFailedException:
+        print(f"DEBUG: Scene {scene_id} was stored concurrently, using the stored copy")
+        try:
+            return load_stored_scene(scene_id) or gemini_scene
+        except Exception as e:
+            print(f"Error fetching scene {scene_id}: {e}")
     except Exception as e:
         print(f"Error saving Gemini scene {scene_id}: {e}")
 
@@ -649,52 +786,133 @@ def get_level_items(level, theme):
 
     return theme_items.get(theme, {}).get(level, [])
 
+# Rendered PNGs keyed by (html, width, height), or by the drawn fields for the
+# Pillow cards; either way the key fully determines the image
+_PNG_CACHE = {}
+_PNG_CACHE_SIZE = 32
+
+# DynamoDB items are capped at 400KB; larger renders are only cached in memory
+MAX_STORED_PNG_BYTES = 390 * 1024
+
+def render_html_to_png_cached(html_content, width=800, height=600):
+    """render_html_to_png, reusing earlier renders of the same HTML (in memory, then DynamoDB)"""
+    key = (html_content, width, height)
+    png_data = _PNG_CACHE.get(key)
+    if png_data is not None:
+        return png_data
+
+    # Shared across containers, so cold starts skip wkhtmltoimage too
+    render_id = f"{hashlib.sha256(html_content.encode('utf-8')).hexdigest()}_{width}x{height}"
+    png_data = get_rendered_png(render_id)
+    if png_data is None:
+        png_data = render_html_to_png(html_content, width, height)
+        if png_data is None:
+            return None
+        store_rendered_png(render_id, png_data)
+
+    return _remember_png(key, png_data)
+
+def _remember_png(key, png_data):
+    """Add rendered PNG bytes to the in-memory cache and return them"""
+    if len(_PNG_CACHE) >= _PNG_CACHE_SIZE:
+        # Evict the oldest entry (dicts keep insertion order)
+        del _PNG_CACHE[next(iter(_PNG_CACHE))]
+    _PNG_CACHE[key] = png_data
+    return png_data
+
+def get_rendered_png(render_id):
+    """Fetch a previously rendered PNG from DynamoDB, or None"""
+    try:
+        response = dynamodb_client.get_item(
+            TableName=rendered_images_table.name,
+            Key={'render_id': {'S': render_id}},
+            ProjectionExpression='png'
+        )
+        if 'Item' in response:
+            print(f"DEBUG: Using stored render {render_id}")
+            return response['Item']['png']['B']
+    except Exception as e:
+        print(f"Error fetching rendered image {render_id}: {e}")
+    return None
+
+def store_rendered_png(render_id, png_data):
+    """Save a rendered PNG to DynamoDB for other containers to reuse"""
+    if len(png_data) > MAX_STORED_PNG_BYTES:
+        return
+    try:
+        dynamodb_client.put_item(
+            TableName=rendered_images_table.name,
+            Item={
+                'render_id': {'S': render_id},
+                'png': {'B': png_data},
+                'created_at': {'S': datetime.now().isoformat()}
+            }
+        )
+    except Exception as e:
+        print(f"Error storing rendered image {render_id}: {e}")
+
 def render_html_to_png(html_content, width=800, height=600):
     """Convert HTML to PNG using wkhtmltoimage"""
     try:
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as html_file:
-            html_file.write(html_content)
-            html_file.flush()
-
-            with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as png_file:
-                png_path = png_file.name
-
-            # Use wkhtmltoimage to convert HTML to PNG
-            cmd = [
-                '/opt/bin/wkhtmltoimage',  # Lambda layer path
-                '--width', str(width),
-                '--height', str(height),
-                '--quality', '95',
-                '--format', 'png',
-                '--disable-smart-width',
-                '--no-stop-slow-scripts',
-                '--javascript-delay', '1000',  # Allow time for fonts to load
-                html_file.name,
-                png_path
-            ]
-
-            # Run the conversion
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-
-            if result.returncode != 0:
-                print(f"wkhtmltoimage error: {result.stderr}")
-                return None
-
-            # Read the generated PNG
-            with open(png_path, 'rb') as f:
-                png_data = f.read()
-
-            # Cleanup
-            os.unlink(html_file.name)
-            os.unlink(png_path)
-
-            return png_data
+        # Use wkhtmltoimage to convert HTML to PNG; '-' for input and output
+        # pipes the HTML in and the PNG out without temp files
+        cmd = [
+            '/opt/bin/wkhtmltoimage',  # Lambda layer path
+            '--width', str(width),
+            '--height', str(height),
+            '--quality', '95',
+            '--format', 'png',
+            '--disable-smart-width',
+            '--no-stop-slow-scripts',
+            '--javascript-delay', '1000',  # Allow time for fonts to load
+            '-',
+            '-'
+        ]
+
+        # Run the conversion
+        result = subprocess.run(cmd, input=html_content.encode('utf-8'), capture_output=True, timeout=10)
+
+        if result.returncode != 0:
+            print(f"wkhtmltoimage error: {result.stderr.decode('utf-8', 'replace')}")
+            return None
+
+        return result.stdout
 
     except Exception as e:
         print(f"HTML to PNG conversion failed: {e}")
         return None
 
+def next_scene_id(scene_id, choice, theme):
+    """Deterministic id for the scene reached by taking `choice` in `scene_id`"""
+    # Regenerating a scene (e.g. a lost write or a concurrent first visit) yields
+    # the same children, and unrelated branches can't collide the way a random
+    # 4-digit suffix could
+    digest = hashlib.blake2b(f'{scene_id}/{choice}'.encode('utf-8'), digest_size=6).hexdigest()
+    return f'{theme}_{digest}'
+
+def _theme_prompt(theme, theme_data):
+    """Prompt block listing a theme's locations, creatures, objects and colours"""
+    return f"""
+
+THEME ELEMENTS FOR {theme.upper()}:
+- Locations: {', '.join(theme_data['locations'])}
+- Creatures: {', '.join(theme_data['creatures'])}
+- Objects: {', '.join(theme_data['objects'])}
+- Color palette: {', '.join(theme_data['colors'])}
+
+Use these elements appropriately in your scene generation.
+"""
+
+# STORY_THEMES is static, so each theme's block is built once at import
+_THEME_PROMPTS = {theme: _theme_prompt(theme, theme_data) for theme, theme_data in STORY_THEMES.items()}
+
+def theme_prompt(theme):
+    """Theme block for the Gemini prompt; unknown themes use the fantasy elements"""
+    prompt = _THEME_PROMPTS.get(theme)
+    if prompt is None:
+        prompt = _theme_prompt(theme, STORY_THEMES['fantasy'])
+    return prompt
+
 def generate_scene_with_gemini(scene_id, theme, previous_scene=None, choice_made=None, player_state=None):
     """Use Google Gemini to generate a new scene with structured output"""
 
@@ -707,21 +925,7 @@ def generate_scene_with_gemini(scene_id, theme, previous_scene=None, choice_made
         prompt = game_state.generate_scene_prompt(player_state, theme, previous_scene, choice_made)
 
         # Add theme-specific elements to the prompt
-        theme_data = STORY_THEMES.get(theme, STORY_THEMES['fantasy'])
-        locations = ', '.join(theme_data['locations'])
-        creatures = ', '.join(theme_data['creatures'])
-        objects = ', '.join(theme_data['objects'])
-
-        prompt += f"""
-
-THEME ELEMENTS FOR {theme.upper()}:
-- Locations: {locations}
-- Creatures: {creatures}
-- Objects: {objects}
-- Color palette: {', '.join(theme_data['colors'])}
-
-Use these elements appropriately in your scene generation.
-"""
+        prompt += theme_prompt(theme)
 
         # Generate scene using Gemini
         response = genai_client.models.generate_content(
@@ -744,8 +948,8 @@ Use these elements appropriately in your scene generation.
             'summary': generated_scene.summary,
             'background_color': generated_scene.background_color,
             'choices': {
-                'a': {'text': generated_scene.choice_a.text, 'leads_to': f'{theme}_{len(scene_id)}a_{random.randint(1000, 9999)}'},
-                'b': {'text': generated_scene.choice_b.text, 'leads_to': f'{theme}_{len(scene_id)}a_{random.randint(1000, 9999)}'}
+                'a': {'text': generated_scene.choice_a.text, 'leads_to': next_scene_id(scene_id, 'a', theme)},
+                'b': {'text': generated_scene.choice_b.text, 'leads_to': next_scene_id(scene_id, 'b', theme)}
             },
             'theme': theme,
             'created_at': datetime.now().isoformat()
@@ -761,15 +965,17 @@ Use these elements appropriately in your scene generation.
 def process_choice(choice):
     """Process a player's choice and update game state"""
     print(f"DEBUG: Processing choice: {choice}")
-    current_state = get_current_game_state()
+    # Never act on a cached scene; that could rewind the story
+    current_state = get_current_game_state(fresh=True)
     current_scene_id = current_state.get('current_scene', 'start')
     print(f"DEBUG: Current scene ID: {current_scene_id}")
 
     scene = get_or_generate_scene(current_scene_id)
-    print(f"DEBUG: Current scene choices: {scene.get('choices', {})}")
+    choices = scene.get('choices', {})
+    print(f"DEBUG: Current scene choices: {choices}")
 
-    if choice in scene.get('choices', {}):
-        next_scene_id = scene['choices'][choice]['leads_to']
+    if choice in choices:
+        next_scene_id = choices[choice]['leads_to']
         print(f"DEBUG: Choice leads to scene: {next_scene_id}")
 
         # Generate the next scene with choice consequences
@@ -777,7 +983,13 @@ def process_choice(choice):
 
         # Update game state to the new scene
         # (Death handling is already done in generate_new_scene)
-        update_game_state(next_scene.get('scene_id', next_scene_id))
+        # Only advance from the scene just read, so two clicks racing on the
+        # same scene move the story one step rather than two
+        if not update_game_state(next_scene.get('scene_id', next_scene_id), current_scene_id):
+            return
+
+        # Generate whichever way the player goes next while they read this one
+        prefetch_next_scenes(next_scene)
 
         # Update death statistics if player died
         if next_scene.get('scene_id') == 'start' and scene.get('scene_id') != 'start':
@@ -790,8 +1002,20 @@ def process_choice(choice):
             except Exception as e:
                 print(f"Error updating death stats: {e}")
 
+# Compiled Jinja templates keyed by source; built on first use since only the
+# image endpoints need Jinja, then reused across warm invocations
+_TEMPLATES = {}
+
+def _template(source):
+    """Compile a Jinja template once per container"""
+    template = _TEMPLATES.get(source)
+    if template is None:
+        from jinja2 import Template
+        template = _TEMPLATES[source] = Template(source)
+    return template
+
 def generate_scene_image():
-    """Generate the main scene image using HTML template rendering"""
+    """Generate the main scene image (Pillow, or HTML template rendering)"""
     print("DEBUG: Starting scene image generation")
     current_state = get_current_game_state()
     scene_id = current_state.get('current_scene', 'start')
@@ -799,6 +1023,10 @@ def generate_scene_image():
     scene = get_or_generate_scene(scene_id)
     print(f"DEBUG: Scene data: {scene.get('title', 'No title')} - {scene.get('description', 'No description')[:50]}...")
 
+    if IMAGE_RENDERER != 'html':
+        key = ('scene', scene_id, scene.get('title'), scene.get('summary'), scene.get('description'))
+        return _PNG_CACHE.get(key) or _remember_png(key, render_scene_pillow(scene, scene_id))
+
     # Get player state - handle both old and new formats
     player_state_data = scene.get('player_state', {})
     print(f"DEBUG: Player state data: {player_state_data}")
@@ -821,19 +1049,11 @@ def generate_scene_image():
     reputation = getattr(player_state, 'reputation', 'unknown')
     print(f"DEBUG: Player stats - Health: {health}/{max_health}, Food: {food}, Gold: {gold}, Corruption: {corruption}")
 
-    # Prepare items display
-    items_display = ""
-    if items:
-        item_names = [ITEMS.get(item, {}).get('name', item) for item in items[:3]]
-        items_display = ", ".join(item_names)
-        if len(items) > 3:
-            items_display += f" (+{len(items)-3} more)"
-
     # Calculate health percentage for progress bar
     health_percentage = (health / max_health * 100) if max_health > 0 else 0
 
     # Render HTML template
-    template = Template(SCENE_TEMPLATE)
+    template = _template(SCENE_TEMPLATE)
     html_content = template.render(
         title=scene.get('title', 'Adventure Scene'),
         description=scene.get('description', 'Your adventure continues...'),
@@ -850,68 +1070,256 @@ def generate_scene_image():
         food=food,
         corruption=corruption,
         reputation=reputation,
-        items=items,
-        items_display=items_display
+        items=items
     )
 
     # Convert HTML to PNG
     print("DEBUG: Converting HTML to PNG")
-    png_data = render_html_to_png(html_content, 800, 600)
-
+    png_data = render_html_to_png_cached(html_content, 800, 600)
+    if png_data is None:
+        # wkhtmltoimage missing or failed; draw the card directly instead
+        png_data = render_scene_pillow(scene, scene_id)
 
     return png_data
 
+def choice_text_class(text):
+    """CHOICE_TEMPLATE size class for the choice text, picked by length up front instead of in page JS"""
+    if len(text) > 40:
+        return 'very-long-text'
+    if len(text) > 25:
+        return 'long-text'
+    return ''
+
 def generate_choice_image(choice_type):
-    """Generate choice button images using HTML template rendering"""
+    """Generate choice button images (Pillow, or HTML template rendering)"""
     current_state = get_current_game_state()
     scene_id = current_state.get('current_scene', 'start')
     scene = get_or_generate_scene(scene_id)
 
-    choice_data = scene.get('choices', {}).get(choice_type, {
-        'text': 'Continue Adventure',
-        'leads_to': 'start'
-    })
+    choice_data = scene.get('choices', {}).get(choice_type, DEFAULT_CHOICE)
+
+    if IMAGE_RENDERER != 'html':
+        key = ('choice', choice_type, choice_data['text'])
+        return _PNG_CACHE.get(key) or _remember_png(key, render_choice_pillow(choice_type, choice_data['text']))
 
     # Color schemes for choices
     color = '#4CAF50' if choice_type == 'a' else '#2196F3'
     hover_color = '#45a049' if choice_type == 'a' else '#1976D2'
 
     # Render HTML template
-    template = Template(CHOICE_TEMPLATE)
+    template = _template(CHOICE_TEMPLATE)
     html_content = template.render(
         choice_type=choice_type,
         text=choice_data['text'],
+        size_class=choice_text_class(choice_data['text']),
         color=color,
         hover_color=hover_color
     )
 
     # Convert HTML to PNG
-    png_data = render_html_to_png(html_content, 400, 150)
+    png_data = render_html_to_png_cached(html_content, 400, 150)
+    if png_data is None:
+        png_data = render_choice_pillow(choice_type, choice_data['text'])
 
     return png_data
 
+# Pillow is imported inside the functions that draw, since /choice/*
+# requests never draw anything.
+
+# FreeType faces keyed by (path, size); survives across warm invocations
+_FONTS = {}
+
+def _font(path, size):
+    """Load a truetype font once per container, falling back to Pillow's default"""
+    key = (path, size)
+    font = _FONTS.get(key)
+    if font is None:
+        from PIL import ImageFont
+        try:
+            font = ImageFont.truetype(path, size)
+        except:
+            try:
+                font = ImageFont.load_default(size)  # scalable on Pillow >= 10.1
+            except TypeError:
+                font = ImageFont.load_default()
+        _FONTS[key] = font
+    return font
+
+# Solid background canvases keyed by (size, colour); callers draw on a copy
+_CANVASES = {}
+
+def _canvas(size, color):
+    """Return a fresh copy of a cached solid-colour RGB canvas"""
+    key = (size, color)
+    base = _CANVASES.get(key)
+    if base is None:
+        from PIL import Image
+        base = _CANVASES[key] = Image.new('RGB', size, color)
+    return base.copy()
+
+def _titled_canvas(size, color, xy, title, font):
+    """Return a fresh copy of a cached canvas with a static white title already drawn"""
+    key = (size, color, xy, title, font)
+    base = _CANVASES.get(key)
+    if base is None:
+        base = _canvas(size, color)
+        _render_text(base, xy, title, font, 'white')
+        _CANVASES[key] = base
+    return base.copy()
+
+# Pre-rendered RGBA layers for the fixed header/label strings, keyed by (text, font, fill)
+_TEXT_CACHE = {}
+
+def _render_text(img, xy, text, font, fill):
+    """Paste a cached rendering of a static string; identical to draw.text on a solid background"""
+    key = (text, font, fill)
+    layer = _TEXT_CACHE.get(key)
+    if layer is None:
+        from PIL import Image, ImageColor, ImageDraw
+        _, _, right, bottom = font.getbbox(text)
+        # Transparent pixels carry the fill colour so antialiased edges don't darken
+        layer = Image.new('RGBA', (right, bottom), ImageColor.getrgb(fill) + (0,))
+        ImageDraw.Draw(layer).text((0, 0), text, fill=fill, font=font)
+        _TEXT_CACHE[key] = layer
+    img.paste(layer, xy, layer)
+
+def _encode_png(img):
+    """Encode as a 64-colour palette PNG with fast zlib settings"""
+    # Flat backgrounds plus antialiased text quantize with at most a few
+    # levels of error on glyph edges, for a several times smaller body
+    from PIL import Image
+    buffer = BytesIO()
+    img.quantize(64, method=Image.Quantize.FASTOCTREE).save(buffer, format='PNG', compress_level=1)
+    return buffer.getvalue()
+
+# Scene and choice cards drawn directly with Pillow. These follow the layout of
+# SCENE_TEMPLATE / CHOICE_TEMPLATE (flattened onto the #0d1117 background) and
+# are the default, since wkhtmltoimage costs a subprocess plus a 1s JS delay
+# per render; set IMAGE_RENDERER=html to use the templates instead.
+IMAGE_RENDERER = os.getenv('IMAGE_RENDERER', 'pillow')
+
+CARD_BACKGROUND = '#0d1117'
+SCENE_BORDER = (134, 136, 139)        # rgba(255,255,255,0.5) over the background
+CHOICE_BORDER = (158, 160, 162)       # rgba(255,255,255,0.6)
+CHOICE_LABEL = (206, 207, 209)        # white at 0.8 opacity
+SUMMARY_FILL = (74, 76, 51)           # rgba(255,255,136,0.25)
+SUMMARY_BAR = '#ffeb3b'
+
+def _card_canvas(size, inset, border_width, border_color, radius):
+    """Copy of a cached background with its rounded decorative border"""
+    key = (size, CARD_BACKGROUND, inset, border_width, border_color, radius)
+    base = _CANVASES.get(key)
+    if base is None:
+        from PIL import Image, ImageDraw
+        width, height = size
+        base = Image.new('RGB', size, CARD_BACKGROUND)
+        ImageDraw.Draw(base).rounded_rectangle(
+            (inset, inset, width - 1 - inset, height - 1 - inset),
+            radius=radius, outline=border_color, width=border_width
+        )
+        _CANVASES[key] = base
+    return base.copy()
+
+def _wrap_text(text, font, max_width):
+    """Greedy word wrap by rendered width; newlines in text start new lines"""
+    space = font.getlength(' ')
+    lines = []
+    for paragraph in text.split('\n'):
+        # Measure each word once and add up widths, instead of re-measuring
+        # the whole line for every word
+        line, line_width = [], 0
+        for word in paragraph.split():
+            word_width = font.getlength(word)
+            if line and line_width + space + word_width > max_width:
+                lines.append(' '.join(line))
+                line, line_width = [word], word_width
+            else:
+                line_width += space + word_width if line else word_width
+                line.append(word)
+        lines.append(' '.join(line))
+    return lines
+
+def _draw_centered(draw, lines, font, y, line_height, width, fill='white'):
+    """Draw lines centred horizontally from y; returns the y below the block"""
+    for line in lines:
+        draw.text(((width - font.getlength(line)) / 2, y), line, fill=fill, font=font)
+        y += line_height
+    return y
+
+def render_scene_pillow(scene, scene_id):
+    """Draw the scene card (title, summary, description) as PNG bytes"""
+    from PIL import ImageDraw
+    width, height, padding = 800, 600, 40
+    img = _card_canvas((width, height), 15, 3, SCENE_BORDER, 15)
+    draw = ImageDraw.Draw(img)
+
+    title_font = _font("/opt/fonts/Arial-Bold.ttf", 36)
+    title_lines = _wrap_text(scene.get('title', 'Adventure Scene'), title_font, width - 2 * padding)
+    y = _draw_centered(draw, title_lines, title_font, padding, 44, width)
+
+    summary = scene.get('summary', '')
+    summary_font = _font("/opt/fonts/Arial.ttf", 18)
+    summary_lines = []
+    if summary and scene_id != 'start':
+        summary_lines = _wrap_text(summary, summary_font, width - 2 * padding - 44)
+    summary_height = len(summary_lines) * 25 + 30 + 20 if summary_lines else 0
+
+    text_font = _font("/opt/fonts/Arial.ttf", 24)
+    description_lines = _wrap_text(scene.get('description', 'Your adventure continues...'), text_font, width - 2 * padding)
+    description_height = len(description_lines) * 38 + 30
+
+    # Centre the summary + description block in the space under the title
+    content_top = y + 25
+    free = height - padding - content_top - summary_height - description_height
+    y = content_top + max(0, free // 2)
+
+    if summary_lines:
+        box_bottom = y + summary_height - 20
+        draw.rounded_rectangle((padding, y, width - padding, box_bottom), radius=8, fill=SUMMARY_FILL)
+        draw.rectangle((padding, y, padding + 3, box_bottom), fill=SUMMARY_BAR)
+        line_y = y + 15
+        for line in summary_lines:
+            draw.text((padding + 24, line_y), line, fill='white', font=summary_font)
+            line_y += 25
+        y += summary_height
+
+    _draw_centered(draw, description_lines, text_font, y, 38, width)
+    return _encode_png(img)
+
+def render_choice_pillow(choice_type, text):
+    """Draw a choice button (label plus wrapped choice text) as PNG bytes"""
+    from PIL import ImageDraw
+    width, height = 400, 150
+    img = _card_canvas((width, height), 0, 2, CHOICE_BORDER, 12)
+    draw = ImageDraw.Draw(img)
+
+    # Same length breakpoints as choice_text_class
+    if len(text) > 40:
+        size, line_height = 12, 14
+    elif len(text) > 25:
+        size, line_height = 14, 16
+    else:
+        size, line_height = 16, 19
+    label_font = _font("/opt/fonts/Arial.ttf", 14)
+    text_font = _font("/opt/fonts/Arial-Bold.ttf", size)
+    lines = _wrap_text(text, text_font, width - 60)
+
+    y = (height - (19 + len(lines) * line_height)) // 2
+    y = _draw_centered(draw, [f"Choice {choice_type.upper()}"], label_font, y, 19, width, CHOICE_LABEL)
+    _draw_centered(draw, lines, text_font, y, line_height, width)
+    return _encode_png(img)
+
 def generate_stats_image():
     """Generate global statistics display image"""
-    try:
-        # Get stats from DynamoDB
-        response = stats_table.scan()
-        stats_data = {item['stat_type']: item for item in response.get('Items', [])}
-    except:
-        stats_data = {}
-
+    from PIL import ImageDraw
     width, height = 600, 300
-    img = Image.new('RGB', (width, height), '#1a1a2e')
-    draw = ImageDraw.Draw(img)
 
-    try:
-        title_font = ImageFont.truetype("/opt/fonts/Arial-Bold.ttf", 32)
-        text_font = ImageFont.truetype("/opt/fonts/Arial.ttf", 20)
-    except:
-        title_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
+    title_font = _font("/opt/fonts/Arial-Bold.ttf", 32)
+    text_font = _font("/opt/fonts/Arial.ttf", 20)
 
-    # Title
-    draw.text((50, 30), "*** Adventure Statistics ***", fill='white', font=title_font)
+    # Background and title are the same every time; only the stats lines change
+    img = _titled_canvas((width, height), '#1a1a2e', (50, 30), "*** Adventure Statistics ***", title_font)
+    draw = ImageDraw.Draw(img)
 
     # Stats
     y_pos = 100
@@ -920,7 +1328,7 @@ def generate_stats_image():
     stats_lines = [
         f"* Total Choices Made: {current_state.get('choices_made', 0)}",
         f"* Current Scene: {current_state.get('current_scene', 'start').replace('_', ' ').title()}",
-        f"* Last Updated: {datetime.now().strftime('%Y-%m-%d %H:%M UTC')}",
+        f"* Last Updated: {time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime())}",
         f"* Adventure Score: {random.randint(1000, 9999)}"
     ]
 
@@ -928,24 +1336,22 @@ def generate_stats_image():
         draw.text((50, y_pos), line, fill='white', font=text_font)
         y_pos += 35
 
-    buffer = BytesIO()
-    img.save(buffer, format='PNG', quality=95)
-    return buffer.getvalue()
+    return _encode_png(img)
 
 def generate_history_image():
     """Generate recent choices history image"""
+    # Fixed content, so encode it once per container
+    png_data = _PNG_CACHE.get(('history',))
+    if png_data is not None:
+        return png_data
+
     width, height = 600, 200
-    img = Image.new('RGB', (width, height), '#2d1b69')
-    draw = ImageDraw.Draw(img)
+    img = _canvas((width, height), '#2d1b69')
     
-    try:
-        title_font = ImageFont.truetype("/opt/fonts/Arial-Bold.ttf", 28)
-        text_font = ImageFont.truetype("/opt/fonts/Arial.ttf", 18)
-    except:
-        title_font = ImageFont.load_default()
-        text_font = ImageFont.load_default()
+    title_font = _font("/opt/fonts/Arial-Bold.ttf", 28)
+    text_font = _font("/opt/fonts/Arial.ttf", 18)
     
-    draw.text((50, 20), "*** Recent Adventures ***", fill='white', font=title_font)
+    _render_text(img, (50, 20), "*** Recent Adventures ***", title_font, 'white')
     
     # Mock recent activity (in production, you'd store actual history)
     recent_choices = [
@@ -957,28 +1363,25 @@ def generate_history_image():
     
     y_pos = 70
     for i, choice in enumerate(recent_choices[:4]):
-        draw.text((50, y_pos), f"• {choice}", fill='#cccccc', font=text_font)
+        _render_text(img, (50, y_pos), f"• {choice}", text_font, '#cccccc')
         y_pos += 25
     
-    buffer = BytesIO()
-    img.save(buffer, format='PNG', quality=95)
-    return buffer.getvalue()
+    return _remember_png(('history',), _encode_png(img))
 
 
 def generate_error_image(error_message):
     """Generate error display image"""
+    # error_message isn't shown, so the image never changes
+    png_data = _PNG_CACHE.get(('error',))
+    if png_data is not None:
+        return png_data
+
     width, height = 600, 200
-    img = Image.new('RGB', (width, height), '#d32f2f')
-    draw = ImageDraw.Draw(img)
+    img = _canvas((width, height), '#d32f2f')
     
-    try:
-        font = ImageFont.truetype("/opt/fonts/Arial-Bold.ttf", 24)
-    except:
-        font = ImageFont.load_default()
+    font = _font("/opt/fonts/Arial-Bold.ttf", 24)
     
-    draw.text((50, 50), "*** Adventure Temporarily Unavailable ***", fill='white', font=font)
-    draw.text((50, 100), "The adventure continues soon...", fill='white', font=font)
+    _render_text(img, (50, 50), "*** Adventure Temporarily Unavailable ***", font, 'white')
+    _render_text(img, (50, 100), "The adventure continues soon...", font, 'white')
     
-    buffer = BytesIO()
-    img.save(buffer, format='PNG', quality=95)
-    return buffer.getvalue()
+    return _remember_png(('error',), _encode_png(img))